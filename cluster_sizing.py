@@ -0,0 +1,391 @@
+import configparser
+import json
+import os
+
+# Redshift node types: on-demand price per node-hour (us-east-1), allowed node counts,
+# and default load rates per node used until the history has enough runs of that type.
+NODE_TYPES = {
+    'dc2.large': {'price': 0.25, 'min_nodes': 1, 'max_nodes': 32,
+                  'bytes_per_sec': 8e6, 'sec_per_object': 0.05},
+    'ra3.xlplus': {'price': 1.086, 'min_nodes': 1, 'max_nodes': 32,
+                   'bytes_per_sec': 20e6, 'sec_per_object': 0.03},
+    'ra3.4xlarge': {'price': 3.26, 'min_nodes': 2, 'max_nodes': 32,
+                    'bytes_per_sec': 60e6, 'sec_per_object': 0.01},
+    'dc2.8xlarge': {'price': 4.80, 'min_nodes': 2, 'max_nodes': 128,
+                    'bytes_per_sec': 90e6, 'sec_per_object': 0.01},
+    'ra3.16xlarge': {'price': 13.04, 'min_nodes': 2, 'max_nodes': 128,
+                     'bytes_per_sec': 240e6, 'sec_per_object': 0.005},
+}
+
+# fixed per-run cost (schema creation, dimension inserts, checks) that does not shrink with more nodes
+DEFAULT_OVERHEAD_SECONDS = 60.0
+
+
+def parse_s3_path(path):
+    """Split an S3 url from dwh.cfg into bucket and prefix.
+
+    Args:
+        path (str): S3 url, optionally quoted, e.g. 's3://udacity-dend/log_data'.
+
+    Returns:
+        tuple: (bucket, prefix).
+    """
+    parts = path.strip("'\"").replace("s3://", "").split("/", 1)
+    return parts[0], parts[1] if len(parts) > 1 else ""
+
+
+def list_s3_input(s3_client, config, sections=('LOG_DATA', 'SONG_DATA')):
+    """List the objects waiting under the S3 input prefixes.
+
+    Args:
+        s3_client (boto3.client): S3 client.
+        config (configparser.ConfigParser): Configuration object with S3 settings.
+        sections (tuple): Keys of the [S3] section to measure.
+
+    Returns:
+        list: Objects as dicts with 'Key' and 'Size', like list_objects_v2 'Contents'.
+    """
+    listing = []
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for section in sections:
+        bucket, prefix = parse_s3_path(config.get('S3', section))
+        for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+            listing.extend({'Key': obj['Key'], 'Size': obj['Size']} for obj in page.get('Contents', []))
+    return listing
+
+
+def create_s3_client(config):
+    """Create an S3 client from the [AWS] settings.
+
+    boto3 is imported here so the sizing model can be used offline without it.
+
+    Args:
+        config (configparser.ConfigParser): Configuration object with AWS settings.
+
+    Returns:
+        boto3.client: S3 client.
+    """
+    import boto3
+    return boto3.client('s3',
+                        region_name=config.get('AWS', 'region'),
+                        aws_access_key_id=config.get('AWS', 'key'),
+                        aws_secret_access_key=config.get('AWS', 'secret'))
+
+
+def load_listing(path):
+    """Load a recorded listing or a Redshift COPY manifest from a JSON file.
+
+    Args:
+        path (str): JSON file holding either a list of {'Key', 'Size'} objects
+            or a manifest {'entries': [{'url', 'meta': {'content_length'}}]}.
+
+    Returns:
+        list: Objects as dicts with 'Key' and 'Size'.
+    """
+    with open(path) as f:
+        data = json.load(f)
+    if isinstance(data, dict) and 'entries' in data:
+        return [{'Key': entry['url'], 'Size': entry['meta']['content_length']} for entry in data['entries']]
+    return data
+
+
+def measure_input(listing):
+    """Sum the pending input of a listing.
+
+    Args:
+        listing (list): Objects as dicts with 'Key' and 'Size'.
+
+    Returns:
+        dict: 'objects' count and total 'bytes'.
+    """
+    return {'objects': len(listing), 'bytes': sum(obj['Size'] for obj in listing)}
+
+
+def load_history(path):
+    """Load past ETL runs from a JSON file.
+
+    Args:
+        path (str): JSON file with a list of runs, missing file means no history.
+
+    Returns:
+        list: Runs as dicts with 'node_type', 'num_nodes', 'objects', 'bytes' and 'seconds'.
+    """
+    if not path or not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def record_run(path, node_type, num_nodes, volume, seconds):
+    """Append a finished ETL run to the history file.
+
+    Args:
+        path (str): JSON history file, created if missing.
+        node_type (str): Node type the run used.
+        num_nodes (int): Number of nodes the run used.
+        volume (dict): Input measured by measure_input.
+        seconds (float): Wall time of the run.
+    """
+    history = load_history(path)
+    history.append({'node_type': node_type, 'num_nodes': num_nodes,
+                    'objects': volume['objects'], 'bytes': volume['bytes'], 'seconds': seconds})
+    with open(path, 'w') as f:
+        json.dump(history, f, indent=2)
+
+
+def fit_history_rates(history, node_type, overhead=DEFAULT_OVERHEAD_SECONDS):
+    """Fit per-node load rates of a node type from its past runs.
+
+    Models node-seconds spent loading as bytes / bytes_per_sec + objects * sec_per_object
+    and solves the two rates by least squares. When the per-object rate comes out negative
+    (or the runs cannot separate the two rates) it is clamped to 0 and a bytes-only rate
+    is fitted.
+
+    Args:
+        history (list): Runs as returned by load_history.
+        node_type (str): Node type to fit.
+        overhead (float): Fixed seconds per run excluded from the fit.
+
+    Returns:
+        tuple: (bytes_per_sec, sec_per_object) for a single node, or None when there are
+        fewer than two usable runs or no positive bytes rate fits.
+    """
+    runs = [run for run in history if run['node_type'] == node_type and run['seconds'] > overhead]
+    if len(runs) < 2:
+        return None
+
+    # normal equations for y = a * bytes + b * objects, with y in node-seconds
+    sbb = sum(run['bytes'] ** 2 for run in runs)
+    soo = sum(run['objects'] ** 2 for run in runs)
+    sbo = sum(run['bytes'] * run['objects'] for run in runs)
+    sby = sum(run['bytes'] * (run['seconds'] - overhead) * run['num_nodes'] for run in runs)
+    soy = sum(run['objects'] * (run['seconds'] - overhead) * run['num_nodes'] for run in runs)
+    det = sbb * soo - sbo ** 2
+    a, b = 0.0, -1.0
+    if det > 0:
+        a = (sby * soo - soy * sbo) / det
+        b = (soy * sbb - sby * sbo) / det
+    if b < 0:
+        # clamp the per-object rate to 0 and refit y = a * bytes
+        a, b = (sby / sbb if sbb else 0.0), 0.0
+    if a <= 0:
+        return None
+    return 1 / a, b
+
+
+def fit_rates(history, node_type, overhead=DEFAULT_OVERHEAD_SECONDS):
+    """Fit per-node load rates of a node type, falling back to its NODE_TYPES defaults.
+
+    Args:
+        history (list): Runs as returned by load_history.
+        node_type (str): Node type to fit.
+        overhead (float): Fixed seconds per run excluded from the fit.
+
+    Returns:
+        tuple: (bytes_per_sec, sec_per_object) for a single node.
+    """
+    rates = fit_history_rates(history, node_type, overhead)
+    if rates is None:
+        defaults = NODE_TYPES[node_type]
+        return defaults['bytes_per_sec'], defaults['sec_per_object']
+    return rates
+
+
+def estimate_seconds(volume, num_nodes, bytes_per_sec, sec_per_object, overhead=DEFAULT_OVERHEAD_SECONDS):
+    """Estimate the wall time of an ETL run.
+
+    Args:
+        volume (dict): Input measured by measure_input.
+        num_nodes (int): Number of nodes.
+        bytes_per_sec (float): Load rate of a single node.
+        sec_per_object (float): Per-object cost on a single node.
+        overhead (float): Fixed seconds per run.
+
+    Returns:
+        float: Estimated seconds.
+    """
+    return overhead + (volume['bytes'] / bytes_per_sec + volume['objects'] * sec_per_object) / num_nodes
+
+
+def recommend_cluster(volume, history, target_seconds, node_types=NODE_TYPES, overhead=DEFAULT_OVERHEAD_SECONDS,
+                      max_nodes=None, max_cost=None, fitted_only=False):
+    """Pick the cheapest node type and count expected to finish within the target wall time.
+
+    Node types with a fitted history use their fitted rates. The others use their NODE_TYPES
+    defaults scaled by the mean ratio of fitted to default bytes rate over the fitted types,
+    and are flagged with 'fitted' set to False.
+
+    Cost is the price of the nodes for the estimated runtime. Configurations above max_nodes
+    are never considered, and ones above max_cost never count as meeting the target. When no
+    configuration meets the target, the fastest one within max_cost (if any) is returned with
+    'meets_target' set to False.
+
+    Args:
+        volume (dict): Input measured by measure_input.
+        history (list): Runs as returned by load_history.
+        target_seconds (float): Wall-time target of the run.
+        node_types (dict): Candidate node types, NODE_TYPES by default.
+        overhead (float): Fixed seconds per run.
+        max_nodes (int): Largest node count to consider, None for the node type limit.
+        max_cost (float): Highest estimated cost per run in dollars, None for no cap.
+        fitted_only (bool): Only consider node types with a fitted history.
+
+    Returns:
+        dict: 'node_type', 'num_nodes', 'cluster_type', 'estimated_seconds', 'estimated_cost',
+        'meets_target', 'within_budget' and 'fitted'.
+    """
+    fitted = {node_type: fit_history_rates(history, node_type, overhead) for node_type in node_types}
+    ratios = [rates[0] / node_types[node_type]['bytes_per_sec'] for node_type, rates in fitted.items() if rates]
+    scale = sum(ratios) / len(ratios) if ratios else 1.0
+    if fitted_only and not ratios:
+        raise ValueError("No node type has a fitted history")
+
+    candidates = []
+    for node_type, spec in node_types.items():
+        if fitted[node_type]:
+            bytes_per_sec, sec_per_object = fitted[node_type]
+        elif fitted_only:
+            continue
+        else:
+            bytes_per_sec, sec_per_object = spec['bytes_per_sec'] * scale, spec['sec_per_object'] / scale
+        top_nodes = spec['max_nodes'] if max_nodes is None else min(spec['max_nodes'], max_nodes)
+        for num_nodes in range(spec['min_nodes'], top_nodes + 1):
+            seconds = estimate_seconds(volume, num_nodes, bytes_per_sec, sec_per_object, overhead)
+            cost = spec['price'] * num_nodes * seconds / 3600
+            within_budget = max_cost is None or cost <= max_cost
+            candidates.append({
+                'node_type': node_type,
+                'num_nodes': num_nodes,
+                'cluster_type': 'single-node' if num_nodes == 1 else 'multi-node',
+                'estimated_seconds': seconds,
+                'estimated_cost': cost,
+                'meets_target': seconds <= target_seconds and within_budget,
+                'within_budget': within_budget,
+                'fitted': fitted[node_type] is not None,
+            })
+    if not candidates:
+        raise ValueError(f"No candidate node type allows at most {max_nodes} nodes")
+
+    meeting = [c for c in candidates if c['meets_target']]
+    if meeting:
+        best = min(meeting, key=lambda c: (c['estimated_cost'], c['num_nodes']))
+    else:
+        affordable = [c for c in candidates if c['within_budget']] or candidates
+        best = min(affordable, key=lambda c: (c['estimated_seconds'], c['estimated_cost']))
+    return dict(best, estimated_seconds=round(best['estimated_seconds'], 1),
+                estimated_cost=round(best['estimated_cost'], 4))
+
+
+def apply_recommendation(config, recommendation):
+    """Write a recommendation into the [DWH] settings read by create_redshift_cluster.
+
+    Args:
+        config (configparser.ConfigParser): Configuration object with Redshift settings.
+        recommendation (dict): Result of recommend_cluster.
+    """
+    config.set('DWH', 'dwh_cluster_type', recommendation['cluster_type'])
+    config.set('DWH', 'dwh_node_type', recommendation['node_type'])
+    config.set('DWH', 'dwh_num_nodes', str(recommendation['num_nodes']))
+
+
+def measure_pending_input(config, s3_client=None):
+    """Measure the input of the next run per the [SIZING] section.
+
+    Uses listing_path when set, otherwise lists LOG_DATA and SONG_DATA on S3, which pages
+    through every input object. Nothing is measured when sizing is off.
+
+    Args:
+        config (configparser.ConfigParser): Configuration object with S3 and SIZING settings.
+        s3_client (boto3.client): S3 client, created from [AWS] when needed and not given.
+
+    Returns:
+        dict: Result of measure_input, or None when nothing is measured.
+    """
+    if config.get('SIZING', 'mode', fallback='off') == 'off':
+        return None
+
+    listing_path = config.get('SIZING', 'listing_path', fallback='')
+    if listing_path:
+        listing = load_listing(listing_path)
+    else:
+        listing = list_s3_input(s3_client or create_s3_client(config), config)
+    return measure_input(listing)
+
+
+def size_cluster(config, volume):
+    """Recommend a cluster size for the measured input per the [SIZING] section.
+
+    In 'auto' mode only node types with a fitted history are considered, and a recommendation
+    that meets the target is applied to the in-memory [DWH] section read by create_redshift_cluster.
+    Otherwise the configured [DWH] size is kept. dwh.cfg itself is never rewritten.
+
+    Args:
+        config (configparser.ConfigParser): Configuration object with SIZING settings.
+        volume (dict): Input measured by measure_pending_input.
+
+    Returns:
+        dict: Result of recommend_cluster, or None when sizing is off.
+    """
+    mode = config.get('SIZING', 'mode', fallback='off')
+    if mode == 'off' or volume is None:
+        return None
+
+    history = load_history(config.get('SIZING', 'history_path', fallback=''))
+    target_seconds = config.getfloat('SIZING', 'target_minutes', fallback=30) * 60
+    max_nodes = config.get('SIZING', 'max_nodes', fallback='')
+    max_cost = config.get('SIZING', 'max_cost', fallback='')
+
+    caps = {'max_nodes': int(max_nodes) if max_nodes else None,
+            'max_cost': float(max_cost) if max_cost else None}
+    print(f"Input: {volume['objects']} objects, {volume['bytes']} bytes")
+    if mode != 'auto':
+        recommendation = recommend_cluster(volume, history, target_seconds, **caps)
+        print(f"Recommended cluster: {recommendation}")
+        return recommendation
+
+    try:
+        recommendation = recommend_cluster(volume, history, target_seconds, fitted_only=True, **caps)
+    except ValueError as e:
+        print(f"{e}, keeping the configured [DWH] size")
+        return None
+    print(f"Recommended cluster: {recommendation}")
+    if recommendation['meets_target']:
+        apply_recommendation(config, recommendation)
+    else:
+        print("No cluster meets the target within the caps, keeping the configured [DWH] size")
+    return recommendation
+
+
+def configured_cluster(config):
+    """Return the node type and count of the [DWH] section.
+
+    Read it before size_cluster to know which cluster the ETL actually runs on.
+
+    Args:
+        config (configparser.ConfigParser): Configuration object with DWH settings.
+
+    Returns:
+        dict: 'node_type' and 'num_nodes'.
+    """
+    return {'node_type': config.get('DWH', 'dwh_node_type'), 'num_nodes': config.getint('DWH', 'dwh_num_nodes')}
+
+
+def record_etl_run(config, volume, seconds, cluster):
+    """Append a finished ETL run to the history file.
+
+    Args:
+        config (configparser.ConfigParser): Configuration object with SIZING settings.
+        volume (dict): Input measured by measure_pending_input, None skips recording.
+        seconds (float): Wall time of the run.
+        cluster (dict): Cluster the run used, as returned by configured_cluster.
+    """
+    history_path = config.get('SIZING', 'history_path', fallback='')
+    if not history_path or volume is None:
+        return
+    record_run(history_path, cluster['node_type'], cluster['num_nodes'], volume, seconds)
+
+
+if __name__ == "__main__":
+    config = configparser.ConfigParser()
+    config.read('dwh.cfg')
+    size_cluster(config, measure_pending_input(config))
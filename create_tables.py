@@ -1,16 +1,52 @@
 import configparser
+import sys
 import psycopg2
-from sql_queries import create_table_queries, drop_table_queries
+from sql_queries import create_table_queries, drop_table_queries, SONGPLAY_LOAD_MODE, songplay_relkind_select, \
+    songplay_table_drop, songplay_view_drop, songplay_partitions_select, songplay_leftovers_select, \
+    songplay_partition_drop
 
 
-def drop_tables(cur, conn):
+def drop_songplay(cur, conn, reset=False):
+    """Drop songplay relations that do not belong to the configured load mode.
+
+    Shadow and retired month tables left by a failed load are always dropped. In 'direct' mode
+    the songplay table (or the view and month tables of a partitioned mode) is dropped as well.
+    In 'swap' and 'append' modes the view and month tables are kept so readers never lose
+    songplay and loaded months are not rebuilt, unless reset is set; a songplay table left
+    from 'direct' mode is dropped.
+
+    Args:
+        cur (psycopg2.extensions.cursor): Cursor object for executing PostgreSQL commands.
+        conn (psycopg2.extensions.connection): Connection object to the PostgreSQL database.
+        reset (bool): Also drop the songplay view and month tables in partitioned modes.
+    """
+    cur.execute(songplay_leftovers_select)
+    for (table,) in cur.fetchall():
+        cur.execute(songplay_partition_drop.format(table=table))
+
+    cur.execute(songplay_relkind_select)
+    row = cur.fetchone()
+    relkind = row[0] if row else None
+    if relkind == 'v' and (SONGPLAY_LOAD_MODE == 'direct' or reset):
+        cur.execute(songplay_view_drop)
+        cur.execute(songplay_partitions_select)
+        for (table,) in cur.fetchall():
+            cur.execute(songplay_partition_drop.format(table=table))
+    elif relkind == 'r':
+        cur.execute(songplay_table_drop)
+    conn.commit()
+
+
+def drop_tables(cur, conn, reset=False):
     """Drop all tables in the Redshift database.
 
     Args:
         cur (psycopg2.extensions.cursor): Cursor object for executing PostgreSQL commands.
         conn (psycopg2.extensions.connection): Connection object to the PostgreSQL database.
+        reset (bool): Also drop the songplay month tables kept by the partitioned load modes.
     """
-    
+    drop_songplay(cur, conn, reset)
+
     for query in drop_table_queries:
         cur.execute(query)
         conn.commit()
@@ -27,10 +63,13 @@ def create_tables(cur, conn):
         cur.execute(query)
         conn.commit()
 
-def create_dwh_schema():
+def create_dwh_schema(reset=False):
     """Create the data warehouse schema in Redshift.
 
     This function connects to the Redshift cluster, drops existing tables, and creates new tables as defined in the SQL queries.
+
+    Args:
+        reset (bool): Also drop the songplay month tables kept by the partitioned load modes.
     """
     config = configparser.ConfigParser()
     config.read('dwh.cfg')
@@ -38,11 +77,11 @@ def create_dwh_schema():
     conn = psycopg2.connect(conn_str)
     cur = conn.cursor()
 
-    drop_tables(cur, conn)
+    drop_tables(cur, conn, reset)
     create_tables(cur, conn)
 
     conn.close()
 
 
 if __name__ == "__main__":
-    create_dwh_schema()
\ No newline at end of file
+    create_dwh_schema(reset='--reset' in sys.argv)
\ No newline at end of file
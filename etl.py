@@ -1,6 +1,11 @@
 import configparser
+from datetime import date
 import psycopg2
-from sql_queries import copy_table_queries, insert_table_queries, check_duplicates_queries
+from sql_queries import copy_table_queries, insert_table_queries, check_duplicates_queries, SONGPLAY_LOAD_MODE, \
+    songplay_months_select, songplay_partitions_select, songplay_partition_create, songplay_partition_drop, \
+    songplay_partition_max_id, songplay_partition_insert, songplay_partition_new_rows_only, \
+    songplay_partition_append, songplay_partition_vacuum, songplay_partition_rename, songplay_view_branch, \
+    songplay_view_create, songplay_view_empty_create
 
 
 def load_staging_tables(cur, conn):
@@ -15,6 +20,129 @@ def load_staging_tables(cur, conn):
         conn.commit()
 
 
+def month_bounds(month):
+    """Return the first day of a month and of the month after it.
+
+    Args:
+        month (str): Month in 'YYYYMM' form.
+
+    Returns:
+        tuple: ISO dates (start, end) bounding the month, end exclusive.
+    """
+    year, mon = int(month[:4]), int(month[4:])
+    start = date(year, mon, 1)
+    end = date(year + mon // 12, mon % 12 + 1, 1)
+    return start.isoformat(), end.isoformat()
+
+
+def execute_autocommit(conn, query):
+    """Execute a statement that Redshift refuses to run inside a transaction block.
+
+    Args:
+        conn (psycopg2.extensions.connection): Connection object to the PostgreSQL database.
+        query (str): Statement to execute, e.g. ALTER TABLE APPEND or VACUUM.
+    """
+    conn.commit()
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            cur.execute(query)
+    finally:
+        conn.autocommit = False
+
+
+def load_songplay_month(cur, conn, month, mode):
+    """Load one month of songplays into its songplay_YYYYMM table through a shadow table.
+
+    The shadow table is filled and sorted while readers keep querying the live month table,
+    then moved in atomically: 'swap' renames it over the month table in one transaction,
+    'append' moves only rows not yet loaded with ALTER TABLE APPEND and skips the append
+    and vacuum when there are none. Only this month's table is ever sorted or vacuumed.
+
+    Args:
+        cur (psycopg2.extensions.cursor): Cursor object for executing PostgreSQL commands.
+        conn (psycopg2.extensions.connection): Connection object to the PostgreSQL database.
+        month (str): Month in 'YYYYMM' form.
+        mode (str): 'swap' or 'append'.
+    """
+    table = f"songplay_{month}"
+    shadow = f"{table}_shadow"
+    retired = f"{table}_retired"
+    start, end = month_bounds(month)
+    id_base = int(month) * 10 ** 10
+
+    cur.execute(songplay_partition_create.format(table=table))
+    cur.execute(songplay_partition_drop.format(table=shadow))
+    cur.execute(songplay_partition_drop.format(table=retired))
+    cur.execute(songplay_partition_create.format(table=shadow))
+
+    if mode == 'append':
+        cur.execute(songplay_partition_max_id.format(table=table, id_base=id_base))
+        id_offset = cur.fetchone()[0]
+        new_rows_only = songplay_partition_new_rows_only.format(table=table)
+    else:
+        id_offset = id_base
+        new_rows_only = ""
+    cur.execute(songplay_partition_insert.format(shadow=shadow, id_offset=id_offset, start=start, end=end,
+                                                 new_rows_only=new_rows_only))
+    new_rows = cur.rowcount
+    conn.commit()
+
+    if mode == 'append' and new_rows == 0:
+        # nothing new for this month, leave the live table untouched
+        cur.execute(songplay_partition_drop.format(table=shadow))
+    elif mode == 'append':
+        execute_autocommit(conn, songplay_partition_append.format(table=table, shadow=shadow))
+        execute_autocommit(conn, songplay_partition_vacuum.format(table=table))
+        cur.execute(songplay_partition_drop.format(table=shadow))
+    else:
+        execute_autocommit(conn, songplay_partition_vacuum.format(table=shadow))
+        cur.execute(songplay_partition_rename.format(table=table, new_name=retired))
+        cur.execute(songplay_partition_rename.format(table=shadow, new_name=table))
+        conn.commit()
+        cur.execute(songplay_partition_drop.format(table=retired))
+    conn.commit()
+
+
+def create_songplay_view(cur, conn):
+    """Create or replace the songplay UNION ALL view over every songplay_YYYYMM table.
+
+    Each branch is bounded by its month so time-filtered queries can skip other months.
+    Without any month table the view is typed and empty, so queries reading songplay still run.
+
+    Args:
+        cur (psycopg2.extensions.cursor): Cursor object for executing PostgreSQL commands.
+        conn (psycopg2.extensions.connection): Connection object to the PostgreSQL database.
+    """
+    cur.execute(songplay_partitions_select)
+    branches = []
+    for (table,) in cur.fetchall():
+        start, end = month_bounds(table[len("songplay_"):])
+        branches.append(songplay_view_branch.format(table=table, start=start, end=end))
+    if branches:
+        cur.execute(songplay_view_create.format(branches="\nUNION ALL".join(branches)))
+    else:
+        cur.execute(songplay_view_empty_create)
+    conn.commit()
+
+
+def load_songplay_partitions(cur, conn, mode=SONGPLAY_LOAD_MODE):
+    """Load songplays month by month from the staging tables and refresh the songplay view.
+
+    Months not present in staging_events are left untouched.
+
+    Args:
+        cur (psycopg2.extensions.cursor): Cursor object for executing PostgreSQL commands.
+        conn (psycopg2.extensions.connection): Connection object to the PostgreSQL database.
+        mode (str): 'swap' or 'append', see load_songplay_month.
+    """
+    cur.execute(songplay_months_select)
+    months = [row[0] for row in cur.fetchall()]
+    for month in months:
+        load_songplay_month(cur, conn, month, mode)
+    create_songplay_view(cur, conn)
+
+
 def insert_tables(cur, conn):
     """Insert data from staging tables into final tables in Redshift.
     
@@ -53,6 +181,8 @@ def fill_dwh_schema():
     cur = conn.cursor()
     
     load_staging_tables(cur, conn)
+    if SONGPLAY_LOAD_MODE != 'direct':
+        load_songplay_partitions(cur, conn)
     insert_tables(cur, conn)
     check_duplicates(cur, conn)
 
@@ -1,20 +1,30 @@
+from time import time
+from cluster_sizing import configured_cluster, measure_pending_input, record_etl_run, size_cluster
 from create_tables import create_dwh_schema
 from etl import fill_dwh_schema
-from notebooks.L3_Ex_2_IaC import cluster_down, cluster_up
+from notebooks.L3_Ex_2_IaC import cluster_down, cluster_up, load_config
 
 def main():
     """Main function to run the ETL process.
 
     This function performs the following steps:
-    1. Start the Redshift cluster.
-    2. Create the data warehouse schema.
-    3. Load and transform the data.
-    4. Shut down the Redshift cluster.
+    1. Measure the pending input and recommend a cluster size.
+    2. Start the Redshift cluster.
+    3. Create the data warehouse schema.
+    4. Load and transform the data, recording the run in the sizing history.
+    5. Shut down the Redshift cluster.
     """
+    config = load_config()
+    # the ETL runs on the existing [CLUSTER] host, whatever size_cluster recommends
+    cluster = configured_cluster(config)
+    volume = measure_pending_input(config)
+    size_cluster(config, volume)
     cluster_up()
 
+    started = time()
     create_dwh_schema()
     fill_dwh_schema()
+    record_etl_run(config, volume, time() - started, cluster)
 
     cluster_down()
 
@@ -9,6 +9,13 @@ LOG_DATA = config.get('S3','LOG_DATA')
 LOG_JSON_PATH = config.get('S3','LOG_JSON_PATH')
 SONG_DATA = config.get('S3','SONG_DATA')
 REGION = "'"+ config.get('AWS','region') +  "'"
+# direct: insert into a single songplay table
+# swap: rebuild each month in a shadow table and rename it into place
+# append: move each month's new rows in with ALTER TABLE APPEND
+SONGPLAY_LOAD_MODES = ('direct', 'swap', 'append')
+SONGPLAY_LOAD_MODE = config.get('ETL', 'songplay_load_mode', fallback='direct')
+if SONGPLAY_LOAD_MODE not in SONGPLAY_LOAD_MODES:
+    raise ValueError(f"Unknown [ETL] songplay_load_mode {SONGPLAY_LOAD_MODE!r}, expected one of {SONGPLAY_LOAD_MODES}")
 
 # DROP TABLES
 
@@ -19,6 +26,8 @@ user_table_drop = "DROP TABLE IF EXISTS users"
 song_table_drop = "DROP TABLE IF EXISTS songs"
 artist_table_drop = "DROP TABLE IF EXISTS artists"
 time_table_drop = "DROP TABLE IF EXISTS time"
+songplay_view_drop = "DROP VIEW IF EXISTS songplay"
+songplay_partition_drop = "DROP TABLE IF EXISTS {table}"
 
 # CREATE TABLES
 staging_events_table_create= ("""
@@ -277,6 +286,136 @@ SELECT DISTINCT
 FROM songplay;
 """)
 
+# SONGPLAY MONTHLY PARTITIONS
+# songplay_YYYYMM tables sit behind a late-binding UNION ALL view named songplay,
+# so a month can be renamed or dropped without touching the view or its readers.
+
+songplay_relkind_select = """
+SELECT c.relkind
+FROM pg_class c
+JOIN pg_namespace n ON n.oid = c.relnamespace
+WHERE n.nspname = 'public' AND c.relname = 'songplay';
+"""
+
+songplay_partitions_select = """
+SELECT tablename
+FROM pg_tables
+WHERE schemaname = 'public' AND tablename ~ '^songplay_[0-9]{6}$'
+ORDER BY tablename;
+"""
+
+# shadow and retired tables left behind by a load that failed half way
+songplay_leftovers_select = """
+SELECT tablename
+FROM pg_tables
+WHERE schemaname = 'public' AND tablename ~ '^songplay_[0-9]{6}_(shadow|retired)$';
+"""
+
+songplay_months_select = """
+SELECT DISTINCT TO_CHAR(timestamp 'epoch' + se.ts/1000 * interval '1 second', 'YYYYMM')
+FROM staging_events se
+WHERE se.page = 'NextSong'
+ORDER BY 1;
+"""
+
+songplay_partition_create = ("""
+    CREATE TABLE IF NOT EXISTS {table} (
+    songplay_id BIGINT NOT NULL PRIMARY KEY,
+    start_time TIMESTAMP NOT NULL,
+    user_id INTEGER,
+    level VARCHAR,
+    song_id VARCHAR,
+    artist_id VARCHAR,
+    session_id INTEGER,
+    location VARCHAR,
+    user_agent VARCHAR)
+    SORTKEY (start_time);
+""")
+
+songplay_partition_max_id = "SELECT COALESCE(MAX(songplay_id), {id_base}) FROM {table};"
+
+# songplay_id = YYYYMM * 10^10 + row number, so ids stay unique across months
+songplay_partition_insert = ("""
+INSERT INTO {shadow} (
+    songplay_id,
+    start_time,
+    user_id,
+    level,
+    song_id,
+    artist_id,
+    session_id,
+    location,
+    user_agent
+)
+SELECT
+    {id_offset} + ROW_NUMBER() OVER (ORDER BY sp.start_time, sp.user_id, sp.session_id, sp.song_id),
+    sp.start_time,
+    sp.user_id,
+    sp.level,
+    sp.song_id,
+    sp.artist_id,
+    sp.session_id,
+    sp.location,
+    sp.user_agent
+FROM (
+    SELECT DISTINCT
+        timestamp 'epoch' + se.ts/1000 * interval '1 second' AS start_time,
+        se.userId AS user_id,
+        se.level,
+        ss.song_id,
+        ss.artist_id,
+        se.sessionId AS session_id,
+        se.location,
+        se.userAgent AS user_agent
+    FROM staging_events se
+    JOIN staging_songs ss ON (se.artist = ss.artist_name AND se.song = ss.title)
+    WHERE se.page = 'NextSong'
+) sp
+WHERE sp.start_time >= '{start}' AND sp.start_time < '{end}'{new_rows_only}
+ORDER BY sp.start_time;
+""")
+
+songplay_partition_new_rows_only = ("""
+    AND NOT EXISTS (
+        SELECT 1 FROM {table} t
+        WHERE t.start_time = sp.start_time
+        AND (t.user_id = sp.user_id OR (t.user_id IS NULL AND sp.user_id IS NULL))
+        AND (t.session_id = sp.session_id OR (t.session_id IS NULL AND sp.session_id IS NULL))
+        AND (t.song_id = sp.song_id OR (t.song_id IS NULL AND sp.song_id IS NULL)))""")
+
+# ALTER TABLE APPEND and VACUUM cannot run inside a transaction block
+songplay_partition_append = "ALTER TABLE {table} APPEND FROM {shadow};"
+songplay_partition_vacuum = "VACUUM SORT ONLY {table} TO 100 PERCENT;"
+
+songplay_partition_rename = "ALTER TABLE {table} RENAME TO {new_name};"
+
+songplay_view_branch = ("""
+SELECT songplay_id, start_time, user_id, level, song_id, artist_id, session_id, location, user_agent
+FROM public.{table}
+WHERE start_time >= '{start}' AND start_time < '{end}'""")
+
+songplay_view_create = ("""
+CREATE OR REPLACE VIEW songplay AS
+{branches}
+WITH NO SCHEMA BINDING;
+""")
+
+# typed empty view used until the first month table exists, so dependent inserts still run
+songplay_view_empty_create = ("""
+CREATE OR REPLACE VIEW songplay AS
+SELECT
+    CAST(NULL AS BIGINT) AS songplay_id,
+    CAST(NULL AS TIMESTAMP) AS start_time,
+    CAST(NULL AS INTEGER) AS user_id,
+    CAST(NULL AS VARCHAR) AS level,
+    CAST(NULL AS VARCHAR) AS song_id,
+    CAST(NULL AS VARCHAR) AS artist_id,
+    CAST(NULL AS INTEGER) AS session_id,
+    CAST(NULL AS VARCHAR) AS location,
+    CAST(NULL AS VARCHAR) AS user_agent
+WHERE FALSE;
+""")
+
 # DATA INTEGRITY CHECKS
 check_duplicates_songplay = """
 SELECT songplay_id, COUNT(*)
@@ -316,7 +455,11 @@ HAVING COUNT(*) > 1;
 # QUERY LISTS
 
 create_table_queries = [staging_events_table_create, staging_songs_table_create, songplay_table_create, user_table_create, song_table_create, artist_table_create, time_table_create]
-drop_table_queries = [staging_events_table_drop, staging_songs_table_drop, songplay_table_drop, user_table_drop, song_table_drop, artist_table_drop, time_table_drop]
+drop_table_queries = [staging_events_table_drop, staging_songs_table_drop, user_table_drop, song_table_drop, artist_table_drop, time_table_drop]
 copy_table_queries = [staging_events_copy, staging_songs_copy]
 insert_table_queries = [songplay_table_insert, user_table_insert, song_table_insert, artist_table_insert, time_table_insert]
+if SONGPLAY_LOAD_MODE != 'direct':
+    # songplay becomes a view over monthly tables, built by etl.load_songplay_partitions
+    create_table_queries.remove(songplay_table_create)
+    insert_table_queries.remove(songplay_table_insert)
 check_duplicates_queries = [check_duplicates_songplay, check_duplicates_users, check_duplicates_songs, check_duplicates_artists, check_duplicates_time]